@@ -21,33 +21,141 @@ import os
 import argparse
 import re
 import hashlib
-from xml.etree import ElementTree as ET
+import json
+import mmap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
 from pathlib import Path
-from datetime import datetime
 from collections import Counter
 
+# flock lets separate worker processes share the fingerprint index; it isn't
+# available on Windows, where only the threads of one process are serialized
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# lxml (libxml2) parses large GPX files much faster and leaner than the
+# standard library; fall back to ElementTree when it isn't installed
+try:
+    from lxml import etree as ET
+    HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAS_LXML = False
+    # Serialize GPX 1.1 elements unprefixed, as lxml keeps the source's prefixes
+    ET.register_namespace('', 'http://www.topografix.com/GPX/1/1')
+
+# Characters dropped when turning a track/route name into a filename
+# (\w covers the same Unicode letters and digits as str.isalnum, plus '_')
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w \-]')
+
+# Index of source fingerprint -> extraction directories, kept in the directory
+# that holds the extractions. Updates take the thread lock and an flock on the
+# lock file next to the index, so worker threads and processes don't lose entries
+_VERSION_INDEX_NAME = '.gpx_extractor_index.json'
+_VERSION_INDEX_LOCK_NAME = '.gpx_extractor_index.lock'
+_version_index_lock = threading.Lock()
+
+# Name/time analysis patterns used by GPXMetadataExtractor
+_SECTION_RE = re.compile(r'-?S(\d+)', re.IGNORECASE)
+_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+_TET_COUNTRY_RE = re.compile(r'TET_([A-Z]{1,3})-\d+')
+_NON_WORD_RE = re.compile(r'[^\w\s-]')
+
+# TET country code map: TET_X-## where X is the country code
+_TET_COUNTRY_CODES = {
+    'S': ('TET_Sweden', 'Sweden'),
+    'D': ('TET_Germany', 'Germany'),
+    'A': ('TET_Austria', 'Austria'),
+    'CH': ('TET_Switzerland', 'Switzerland'),
+    'F': ('TET_France', 'France'),
+    'E': ('TET_Spain', 'Spain'),
+    'P': ('TET_Portugal', 'Portugal'),
+    'I': ('TET_Italy', 'Italy'),
+    'HR': ('TET_Croatia', 'Croatia'),
+    'SLO': ('TET_Slovenia', 'Slovenia'),
+    'BIH': ('TET_BosniaHerzegovina', 'Bosnia'),
+    'MNE': ('TET_Montenegro', 'Montenegro'),
+    'AL': ('TET_Albania', 'Albania'),
+    'MK': ('TET_NorthMacedonia', 'North Macedonia'),
+    'GR': ('TET_Greece', 'Greece'),
+}
+
+# Lowercased region names for the keyword fallback, in the same order as above
+_TET_REGION_INDEX = tuple((region.lower(), trail, region)
+                          for trail, region in _TET_COUNTRY_CODES.values())
+
+
+def new_source_hash():
+    """Return the hash object used for the source file fingerprint"""
+    return hashlib.blake2b(digest_size=8)
+
+
+def _iter_summary_files(directory):
+    """Recursively yield the paths of *_extraction_summary.txt files below directory"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_summary_files(entry.path)
+            elif entry.name.endswith('_extraction_summary.txt'):
+                yield entry.path
+
+
+@contextmanager
+def _locked_version_index(directory):
+    """Hold the fingerprint index lock in directory for a read-modify-write"""
+    with _version_index_lock, open(directory / _VERSION_INDEX_LOCK_NAME, 'a') as lock_file:
+        if fcntl is not None:
+            # Released when the lock file is closed
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _scan_version_index(directory):
+    """Build the fingerprint index by reading the summaries below directory"""
+    index = {}
+    marker = b"Source fingerprint: "
+    for summary_file in _iter_summary_files(directory):
+        # Search the raw bytes of the summary instead of decoding it
+        try:
+            with open(summary_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as summary_map:
+                start = summary_map.find(marker)
+                if start == -1:
+                    continue
+                start += len(marker)
+                end = summary_map.find(b'\n', start)
+                digest = summary_map[start:end if end != -1 else len(summary_map)]
+        except (OSError, ValueError):
+            continue  # Unreadable or empty summary
+        digest = digest.decode('ascii', 'replace').strip()
+        if digest and digest != 'N/A':
+            index.setdefault(digest, []).append(
+                os.path.basename(os.path.dirname(summary_file)))
+    return index
+
 
 class GPXMetadataExtractor:
     """Extract and analyze GPX file metadata for intelligent naming"""
     
-    def __init__(self):
-        self.patterns = {
-            'tet_sweden': [
-                r'tet\s*sweden', r'sweden\s*tet', r'trans\s*euro\s*trail\s*sweden',
-                r'S-\d+', r'-S\d+', r'sweden', r'sverige'
-            ],
-            'version_markers': [
-                r'v(\d+\.?\d*)', r'version\s*(\d+\.?\d*)', r'rev\s*(\d+)',
-                r'build\s*(\d+)', r'(\d{4}-\d{2}-\d{2})', r'(\d{2}/\d{2}/\d{4})'
-            ],
-            'date_patterns': [
-                r'(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})Z?',
-                r'(\d{4}/\d{2}/\d{2})', r'(\d{2}/\d{2}/\d{4})',
-                r'(\d{4}\d{2}\d{2})'
-            ]
-        }
+    @staticmethod
+    def group_top_level(root):
+        """Group the children of the GPX root by tag in a single pass.
+        
+        GPX only allows metadata, wpt, rte and trk directly under <gpx>, so this
+        replaces separate './/' descendant searches over the whole tree.
+        """
+        groups = {}
+        for child in root:
+            groups.setdefault(child.tag, []).append(child)
+        return groups
     
-    def extract_metadata(self, root, namespace=None):
+    def extract_metadata(self, root, namespace=None, top_level=None):
         """Extract comprehensive metadata from GPX root element"""
         metadata = {
             'name': None,
@@ -65,16 +173,13 @@ class GPXMetadataExtractor:
         }
         
         # Extract basic metadata
-        if namespace:
-            metadata_elem = root.find('.//{%s}metadata' % namespace)
-            waypoints = root.findall('.//{%s}wpt' % namespace)
-            tracks = root.findall('.//{%s}trk' % namespace)
-            routes = root.findall('.//{%s}rte' % namespace)
-        else:
-            metadata_elem = root.find('.//metadata')
-            waypoints = root.findall('.//wpt')
-            tracks = root.findall('.//trk')
-            routes = root.findall('.//rte')
+        if top_level is None:
+            top_level = self.group_top_level(root)
+        prefix = '{%s}' % namespace if namespace else ''
+        metadata_elem = top_level.get(prefix + 'metadata', [None])[0]
+        waypoints = top_level.get(prefix + 'wpt', [])
+        tracks = top_level.get(prefix + 'trk', [])
+        routes = top_level.get(prefix + 'rte', [])
         
         # Count elements
         metadata['waypoint_count'] = len(waypoints)
@@ -90,6 +195,8 @@ class GPXMetadataExtractor:
         # Extract metadata fields
         if metadata_elem is not None:
             for child in metadata_elem:
+                if not isinstance(child.tag, str):
+                    continue  # Skip comments and processing instructions
                 tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
                 if tag == 'time':
                     metadata['build_date'] = child.text
@@ -103,7 +210,8 @@ class GPXMetadataExtractor:
         metadata.update(content_analysis)
         
         # Generate content hash for version detection
-        metadata['content_hash'] = self._generate_content_hash(root)
+        counts = (metadata['waypoint_count'], metadata['track_count'], metadata['route_count'])
+        metadata['content_hash'] = self._generate_content_hash(root, metadata_elem, counts)
         
         # Generate suggested name
         metadata['suggested_name'] = self._generate_suggested_name(metadata)
@@ -120,94 +228,58 @@ class GPXMetadataExtractor:
             'latest_modification': None
         }
         
-        section_pattern = re.compile(r'-?S(\d+)', re.IGNORECASE)
-        date_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})')
+        # name and time are direct children of wpt/trk
+        prefix = '{%s}' % namespace if namespace else ''
+        name_tag, time_tag = prefix + 'name', prefix + 'time'
         
-        all_names = []
-        all_dates = []
-        section_numbers = []
+        # Collect waypoint names and times, then scan each set with a single regex
+        # call over the newline-joined texts (neither pattern can match across lines)
+        waypoint_names = [name for wpt in waypoints if (name := wpt.findtext(name_tag))]
+        waypoint_times = [time for wpt in waypoints if (time := wpt.findtext(time_tag))]
         
-        # Analyze waypoint names and times
-        for wpt in waypoints:
-            # Handle namespaced element searches
-            if namespace:
-                name_elem = wpt.find('.//{%s}name' % namespace)
-                time_elem = wpt.find('.//{%s}time' % namespace)
-            else:
-                name_elem = wpt.find('.//name')
-                time_elem = wpt.find('.//time')
-            
-            if name_elem is not None and name_elem.text:
-                name = name_elem.text
-                all_names.append(name)
-                
-                # Look for section markers like -S12, S18, etc.
-                sections = section_pattern.findall(name)
-                section_numbers.extend([int(s) for s in sections])
-            
-            if time_elem is not None and time_elem.text:
-                time_text = time_elem.text
-                dates = date_pattern.findall(time_text)
-                all_dates.extend(dates)
-        
-        # Analyze track names
-        for trk in tracks:
-            if namespace:
-                name_elem = trk.find('.//{%s}name' % namespace)
-            else:
-                name_elem = trk.find('.//name')
-            
-            if name_elem is not None and name_elem.text:
-                all_names.append(name_elem.text)
+        # Look for section markers like -S12, S18, etc.
+        section_numbers = list(map(int, _SECTION_RE.findall('\n'.join(waypoint_names))))
+        
+        # ISO dates order lexicographically, so the latest is the largest string
+        latest_date = None
+        if waypoint_times:
+            latest_date = max(_DATE_RE.findall('\n'.join(waypoint_times)), default=None)
+        
+        # Add track names
+        all_names = waypoint_names + [name for trk in tracks if (name := trk.findtext(name_tag))]
         
         # Determine trail type and region based on content
-        name_text = ' '.join(all_names) if all_names else ""
-        name_text_lower = name_text.lower()
-
-        # TET country code map: TET_X-## where X is the country code
-        tet_country_codes = {
-            'S': ('TET_Sweden', 'Sweden'),
-            'D': ('TET_Germany', 'Germany'),
-            'A': ('TET_Austria', 'Austria'),
-            'CH': ('TET_Switzerland', 'Switzerland'),
-            'F': ('TET_France', 'France'),
-            'E': ('TET_Spain', 'Spain'),
-            'P': ('TET_Portugal', 'Portugal'),
-            'I': ('TET_Italy', 'Italy'),
-            'HR': ('TET_Croatia', 'Croatia'),
-            'SLO': ('TET_Slovenia', 'Slovenia'),
-            'BIH': ('TET_BosniaHerzegovina', 'Bosnia'),
-            'MNE': ('TET_Montenegro', 'Montenegro'),
-            'AL': ('TET_Albania', 'Albania'),
-            'MK': ('TET_NorthMacedonia', 'North Macedonia'),
-            'GR': ('TET_Greece', 'Greece'),
-        }
-
         detected_trail = None
         detected_region = None
 
-        # Try to detect country from TET_XX-## pattern in track names
-        tet_country_match = re.search(r'TET_([A-Z]{1,3})-\d+', name_text)
+        # Try to detect country from TET_XX-## pattern in track names, stopping at
+        # the first name that carries one
+        tet_country_match = next(
+            (match for name in all_names if (match := _TET_COUNTRY_RE.search(name))), None)
         if tet_country_match:
             code = tet_country_match.group(1)
-            if code in tet_country_codes:
-                detected_trail, detected_region = tet_country_codes[code]
+            if code in _TET_COUNTRY_CODES:
+                detected_trail, detected_region = _TET_COUNTRY_CODES[code]
             else:
                 detected_trail = f'TET_{code}'
                 detected_region = code
 
-        # Fallback: check for explicit country names in text
+        # The keyword fallbacks need all names as one lowercase text; only build
+        # it when no country code was found
         if not detected_trail:
-            for code, (trail, region) in tet_country_codes.items():
-                if region.lower() in name_text_lower:
+            name_text_lower = ' '.join(all_names).lower()
+
+            # Fallback: check for explicit country names in text
+            for region_lower, trail, region in _TET_REGION_INDEX:
+                if region_lower in name_text_lower:
                     detected_trail = trail
                     detected_region = region
                     break
 
-        # Final fallback: generic TET if TET keyword present
-        if not detected_trail and 'tet' in name_text_lower:
-            detected_trail = 'TET'
-            detected_region = None
+            # Final fallback: generic TET if TET keyword present
+            if not detected_trail and 'tet' in name_text_lower:
+                detected_trail = 'TET'
+                detected_region = None
 
         if detected_trail:
             analysis['trail_type'] = detected_trail
@@ -223,13 +295,12 @@ class GPXMetadataExtractor:
                 analysis['section_markers'] = [f"S{min_section:02d}-S{max_section:02d}"]
         
         # Find latest modification date
-        if all_dates:
-            latest_date = max(all_dates)
+        if latest_date:
             analysis['latest_modification'] = latest_date
         
         return analysis
     
-    def _generate_content_hash(self, root):
+    def _generate_content_hash(self, root, metadata_elem, counts):
         """Generate hash of GPX content for version detection"""
         # Create a normalized string representation of the GPX content
         content_parts = []
@@ -239,23 +310,18 @@ class GPXMetadataExtractor:
             content_parts.append(f"creator:{root.attrib['creator']}")
         
         # Include bounds if available
-        metadata = root.find('.//metadata')
-        if metadata is not None:
-            bounds = metadata.find('.//bounds')
+        if metadata_elem is not None:
+            bounds = metadata_elem.find('.//{*}bounds')
             if bounds is not None:
                 bound_str = f"bounds:{bounds.attrib.get('minlat', '')},{bounds.attrib.get('maxlat', '')}"
                 content_parts.append(bound_str)
         
-        # Include counts of major elements
-        waypoints = root.findall('.//wpt')
-        tracks = root.findall('.//trk')
-        routes = root.findall('.//rte')
-        
-        content_parts.append(f"counts:wpt={len(waypoints)},trk={len(tracks)},rte={len(routes)}")
+        # Include counts of major elements, as already counted for the metadata
+        content_parts.append("counts:wpt={},trk={},rte={}".format(*counts))
         
-        # Create hash
+        # Create hash (a 4-byte digest gives the same 8 hex characters as before)
         content_string = '|'.join(content_parts)
-        return hashlib.md5(content_string.encode()).hexdigest()[:8]
+        return hashlib.blake2b(content_string.encode(), digest_size=4).hexdigest()
     
     def _generate_suggested_name(self, metadata):
         """Generate a suggested filename based on metadata analysis"""
@@ -266,7 +332,7 @@ class GPXMetadataExtractor:
             name_parts.append(metadata['trail_type'].replace(' ', '_'))
         elif metadata.get('name'):
             # Clean up the name
-            clean_name = re.sub(r'[^\w\s-]', '', metadata['name'])
+            clean_name = _NON_WORD_RE.sub('', metadata['name'])
             name_parts.append(clean_name.replace(' ', '_'))
         else:
             name_parts.append('GPX_Track')
@@ -303,7 +369,7 @@ class GPXMetadataExtractor:
             name_parts.append(metadata['trail_type'].replace(' ', '_'))
         elif metadata.get('name'):
             # Clean up the name
-            clean_name = re.sub(r'[^\w\s-]', '', metadata['name'])
+            clean_name = _NON_WORD_RE.sub('', metadata['name'])
             name_parts.append(clean_name.replace(' ', '_'))
         else:
             name_parts.append('GPX_Track')
@@ -327,30 +393,170 @@ class GPXMetadataExtractor:
         return original_filename
 
 
+class _SourceElementScanner:
+    """SAX-style expat handler that indexes top-level GPX elements without building a tree.
+    
+    For every <tag> directly under <gpx> it records where the element's markup
+    starts and ends in the source bytes, the text of its <name> child and the
+    number of <point_tag> children, so the element can be copied out verbatim.
+    """
+    
+    def __init__(self, tag, point_tag):
+        self.tag = tag
+        self.point_tag = point_tag
+        self.elements = []
+        self._depth = 0
+        self._current = None
+        self._name_parts = None
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+    
+    def scan(self, data):
+        """Parse the whole document and return the indexed elements"""
+        self._parser.Parse(data, True)
+        return self.elements
+    
+    def _start_element(self, name, _attrs):
+        self._depth += 1
+        local_name = name.rpartition(':')[2]
+        if self._depth == 2:
+            if local_name == self.tag:
+                self._current = {'start': self._parser.CurrentByteIndex, 'qname': name,
+                                 'name': None, 'points': 0}
+        elif self._depth == 3 and self._current is not None:
+            if local_name == self.point_tag:
+                self._current['points'] += 1
+            elif local_name == 'name' and self._current['name'] is None:
+                self._name_parts = []
+    
+    def _character_data(self, data):
+        if self._name_parts is not None:
+            self._name_parts.append(data)
+    
+    def _end_element(self, _name):
+        if self._name_parts is not None and self._depth == 3:
+            self._current['name'] = ''.join(self._name_parts) or None
+            self._name_parts = None
+        elif self._depth == 2 and self._current is not None:
+            # expat reports the start of the closing tag here, or the first byte
+            # after the element for a self-closing tag
+            self._current['end_marker'] = self._parser.CurrentByteIndex
+            self.elements.append(self._current)
+            self._current = None
+        self._depth -= 1
+    
+    @staticmethod
+    def markup(source, element):
+        """Slice one indexed element's original markup out of the source bytes"""
+        end_marker = element['end_marker']
+        closing_tag = b'</' + element['qname'].encode('utf-8')
+        if source[end_marker:end_marker + len(closing_tag)] == closing_tag:
+            return source[element['start']:source.find(b'>', end_marker) + 1]
+        return source[element['start']:end_marker]
+
+
 class GPXExtractor:
-    def __init__(self, gpx_file_path, output_dir=None):
+    def __init__(self, gpx_file_path, output_dir=None, verbose=False, file_digest=None):
         self.gpx_file_path = Path(gpx_file_path)
+        # Precomputed new_source_hash() hexdigest of the file, e.g. hashed while uploading
+        self.file_digest = file_digest
         self.output_dir = Path(output_dir) if output_dir else self.gpx_file_path.parent
         self.tree = None
         self.root = None
         self.namespace = {}
+        self.queries = {}
+        self.top_level = {}
+        self._headers = {}
         self.metadata = {}
         self.metadata_extractor = GPXMetadataExtractor()
-        
-    def load_gpx(self):
-        """Load and parse the GPX file with metadata analysis"""
+        self.verbose = verbose
+        self._log = []
+        
+    def _report(self, message, detail=False):
+        """Queue an extractor status line; per-file detail lines only in verbose mode"""
+        if detail and not self.verbose:
+            return
+        self._log.append(message)  # list.append is atomic, safe from worker threads
+    
+    def flush_report(self):
+        """Write all queued extractor status lines to stdout in one call"""
+        if self._log:
+            sys.stdout.write('\n'.join(self._log) + '\n')
+            self._log.clear()
+    
+    @staticmethod
+    def _prune_streamed(elem):
+        """Drop the children of a parsed trkpt/wpt that no extractor reads"""
+        if elem.tag.rpartition('}')[2] == 'trkpt':
+            del elem[:]
+            return
+        for child in list(elem):
+            # Comments and processing instructions have a non-string tag
+            if not isinstance(child.tag, str) or child.tag.rpartition('}')[2] not in ('name', 'time'):
+                elem.remove(child)
+    
+    def load_gpx(self, metadata=None):
+        """Load and parse the GPX file with metadata analysis.
+
+        metadata, when given, is the result of an earlier analysis of the same
+        file (e.g. the one done at upload) and is reused instead of analysing
+        the tree again.
+        """
         try:
-            self.tree = ET.parse(self.gpx_file_path)
-            self.root = self.tree.getroot()
+            # Stream-parse and prune each track point and waypoint as soon as it is
+            # complete. Track points are the bulk of a GPX file and the extractors
+            # never read their <ele>/<time>/<extensions> children; of a waypoint only
+            # <name> and <time> are read, so its <extensions> (often large on POI
+            # exports) go too. Peak memory no longer scales with the full track log.
+            # huge_tree lifts libxml2's depth/text-size limits for very large exports;
+            # entity resolution stays off since uploads are untrusted input
+            if HAS_LXML:
+                context = ET.iterparse(str(self.gpx_file_path), events=('end',), tag=('{*}trkpt', '{*}wpt'),
+                                       remove_blank_text=False, huge_tree=True, resolve_entities=False)
+                for _, elem in context:
+                    self._prune_streamed(elem)
+                self.root = context.root
+                self.tree = self.root.getroottree()
+            else:
+                context = ET.iterparse(str(self.gpx_file_path), events=('end',))
+                for _, elem in context:
+                    if elem.tag.rpartition('}')[2] in ('trkpt', 'wpt'):
+                        self._prune_streamed(elem)
+                self.root = context.root
+                self.tree = ET.ElementTree(self.root)
             
             # Extract namespace information
             if self.root.tag.startswith('{'):
                 self.namespace[''] = self.root.tag.split('}')[0][1:]
                 self.namespace['default'] = self.namespace['']
             
-            # Extract comprehensive metadata
+            # Build the namespaced element queries once for all extractors. GPX
+            # places wpt/trk/rte directly under <gpx> and name/rtept/trkseg directly
+            # under those, so child paths replace full './/' descendant walks.
             namespace = self.namespace.get('default')
-            self.metadata = self.metadata_extractor.extract_metadata(self.root, namespace)
+            prefix = '{%s}' % namespace if namespace else ''
+            self.queries = {tag: prefix + tag for tag in ('wpt', 'trk', 'rte', 'rtept', 'name')}
+            self.queries['trkpt'] = f'{prefix}trkseg/{prefix}trkpt'
+            
+            # Group wpt/trk/rte once; the metadata analysis and every extractor reuse it
+            self.top_level = self.metadata_extractor.group_top_level(self.root)
+            self._headers.clear()
+            
+            # Extract comprehensive metadata
+            if metadata:
+                self.metadata = dict(metadata)
+            else:
+                self.metadata = self.metadata_extractor.extract_metadata(self.root, namespace, self.top_level)
+            
+            # Fingerprint the raw source bytes for duplicate detection, unless the
+            # caller already hashed them; the file was just parsed, so this read
+            # is served from the OS page cache
+            if self.file_digest is None:
+                with open(self.gpx_file_path, 'rb') as f:
+                    self.file_digest = hashlib.file_digest(f, new_source_hash).hexdigest()
+            self.metadata['file_digest'] = self.file_digest
             
             print(f"✓ Loaded GPX file: {self.gpx_file_path}")
             print(f"✓ Root namespace: {self.namespace.get('default', 'None')}")
@@ -389,20 +595,15 @@ class GPXExtractor:
             return False, None
         
         suggested_base = self.metadata.get('suggested_name', self.gpx_file_path.stem)
-        content_hash = self.metadata.get('content_hash')
+        file_digest = self.metadata.get('file_digest')
         
-        # Look for files with similar names or same content hash
-        existing_files = []
-        for existing_file in self.output_dir.glob('**/*_extraction_summary.txt'):
-            summary_path = existing_file
-            
-            # Read existing summary to check for content hash
-            try:
-                summary_content = summary_path.read_text()
-                if content_hash and content_hash in summary_content:
-                    existing_files.append(summary_path.parent.name)
-            except Exception:
-                continue
+        # Look up extractions of a byte-identical source file in the index, skipping
+        # directories whose summary has since been cleaned up
+        index = self._load_version_index(self.output_dir)
+        if index is None:
+            index = self._seed_version_index(self.output_dir)
+        existing_files = [name for name in index.get(file_digest, [])
+                          if any((self.output_dir / name).glob('*_extraction_summary.txt'))]
         
         if existing_files:
             print(f"\n⚠️  Found potentially similar versions:")
@@ -412,266 +613,416 @@ class GPXExtractor:
         
         return False, None
     
+    @staticmethod
+    def _load_version_index(directory):
+        """Read the fingerprint index in directory, or None if there isn't one"""
+        try:
+            return json.loads((directory / _VERSION_INDEX_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _write_version_index(directory, index):
+        """Replace the fingerprint index in directory with index"""
+        # Write to a temporary file first so readers never see a partial index
+        temp_file = directory / f"{_VERSION_INDEX_NAME}.{os.getpid()}.tmp"
+        temp_file.write_text(json.dumps(index), encoding='utf-8')
+        os.replace(temp_file, directory / _VERSION_INDEX_NAME)
+    
+    @classmethod
+    def _seed_version_index(cls, directory):
+        """Create the fingerprint index in directory from the summaries already there"""
+        try:
+            with _locked_version_index(directory):
+                index = cls._load_version_index(directory)
+                if index is None:
+                    index = _scan_version_index(directory)
+                    cls._write_version_index(directory, index)
+                return index
+        except OSError:
+            # Not writable; the next run scans again
+            return _scan_version_index(directory)
+    
+    def _record_version(self):
+        """Add the current output directory to the fingerprint index next to it"""
+        file_digest = self.metadata.get('file_digest')
+        if not file_digest:
+            return
+        
+        index_dir = self.output_dir.parent
+        with _locked_version_index(index_dir):
+            # Start from the existing summaries if there's no index yet, so
+            # extractions made before it existed stay findable
+            index = self._load_version_index(index_dir)
+            if index is None:
+                index = _scan_version_index(index_dir)
+            names = index.setdefault(file_digest, [])
+            if self.output_dir.name in names:
+                return
+            names.append(self.output_dir.name)
+            self._write_version_index(index_dir, index)
+    
     def get_gpx_header(self, content_type="extracted"):
         """Create a clean, simple GPX header compatible with all platforms"""
-        return '''<?xml version="1.0" encoding="UTF-8"?>
-<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="GPX Extractor">
+        # The header only depends on the loaded document and the content type
+        header = self._headers.get(content_type)
+        if header is not None:
+            return header
+        
+        # Re-declare the source's prefixed namespaces (e.g. gpxx extensions) so
+        # markup copied verbatim from the source file stays well-formed
+        # ElementTree has no nsmap and declares namespaces on the elements it writes
+        nsmap = getattr(self.root, 'nsmap', {})
+        namespaces = ''.join(f' xmlns:{prefix}={quoteattr(uri)}'
+                             for prefix, uri in nsmap.items() if prefix)
+        header = self._headers[content_type] = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="GPX Extractor"{}>
 \t<metadata>
 \t\t<name>Extracted {}</name>
 \t</metadata>
-'''.format(content_type.title())
-        
-        # Add metadata
-        header += '  <metadata>\n'
-        
-        # Try to preserve original metadata
-        if self.namespace.get('default'):
-            metadata_elem = self.root.find('.//{%s}metadata' % self.namespace['default'])
-        else:
-            metadata_elem = self.root.find('.//metadata')
-        if metadata_elem is not None:
-            # Copy existing metadata but update some fields
-            for child in metadata_elem:
-                if child.tag == 'time':
-                    # Update time to current time
-                    current_time = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-                    header += f'    <time>{current_time}</time>\n'
-                elif child.tag.endswith('bounds'):
-                    # Skip bounds, will be recalculated if needed
-                    continue
-                else:
-                    # Copy other metadata as-is
-                    header += f'    {ET.tostring(child, encoding="unicode")}\n'
-        else:
-            # Create basic metadata if none exists
-            current_time = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-            header += f'    <time>{current_time}</time>\n'
-            header += f'    <desc>Extracted {content_type} from {self.gpx_file_path.name}</desc>\n'
-        
-        header += '  </metadata>\n\n'
-        
+'''.format(namespaces, content_type.title())
         return header
     
+    def _can_copy_source_bytes(self):
+        """Check whether top-level elements can be copied verbatim from the source file"""
+        if not HAS_LXML:
+            # Encoding and DOCTYPE can't be checked without lxml's docinfo
+            return False
+        docinfo = self.tree.docinfo
+        return (
+            (docinfo.encoding or 'UTF-8').upper() in ('UTF-8', 'UTF8', 'ASCII', 'US-ASCII')
+            and not docinfo.doctype
+            and self.root.nsmap.get(None) == 'http://www.topografix.com/GPX/1/1'
+        )
+    
     def extract_waypoints_enhanced(self, base_name):
         """Extract all waypoints in clean, compatible format"""
+        jobs = self._waypoint_jobs(base_name)
+        self._write_files(jobs)
+        return self._report_waypoints(jobs)
+    
+    def _waypoint_jobs(self, base_name):
+        """Build the write job for the waypoints file (an empty list when there are none)"""
         # Ensure output_dir is a Path object
-        from pathlib import Path
         if not isinstance(self.output_dir, Path):
             self.output_dir = Path(self.output_dir)
             
-        # Handle namespaced elements
-        if self.namespace.get('default'):
-            waypoints = self.root.findall('.//{%s}wpt' % self.namespace['default'])
-        else:
-            waypoints = self.root.findall('.//wpt')
+        waypoints = self.top_level.get(self.queries['wpt'], [])
         
         if not waypoints:
-            print("ℹ No waypoints found")
-            return None
+            self._report("ℹ No waypoints found")
+            return []
             
         output_file = self.output_dir / f"{base_name}_waypoints.gpx"
         
-        # Create clean waypoint content
-        gpx_content = '''<?xml version="1.0" encoding="UTF-8"?>
+        # Create clean waypoint content, collecting the pieces for a single join
+        parts = ['''<?xml version="1.0" encoding="UTF-8"?>
 <gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="GPX Extractor">
 \t<metadata>
 \t\t<name>Extracted Waypoints</name>
 \t</metadata>
-'''
+''']
         
+        name_query = self.queries['name']
         for wpt in waypoints:
             lat = wpt.get('lat')
             lon = wpt.get('lon')
             if lat and lon:
                 # Get waypoint name if available
-                if self.namespace.get('default'):
-                    name_elem = wpt.find('.//{%s}name' % self.namespace['default'])
-                else:
-                    name_elem = wpt.find('.//name')
+                name_elem = wpt.find(name_query)
                 
-                wpt_name = name_elem.text if name_elem is not None and name_elem.text else ""
-                
-                gpx_content += f'\t<wpt lat="{lat}" lon="{lon}">\n'
-                if wpt_name:
-                    gpx_content += f'\t\t<name>{wpt_name}</name>\n'
-                gpx_content += '\t</wpt>\n'
-        
-        gpx_content += '</gpx>'
+                # Coordinates come straight from the source attributes, so quote them too
+                lat, lon = quoteattr(lat), quoteattr(lon)
+                if name_elem is not None and name_elem.text:
+                    parts.append(f'\t<wpt lat={lat} lon={lon}>\n\t\t<name>{escape(name_elem.text)}</name>\n\t</wpt>\n')
+                else:
+                    parts.append(f'\t<wpt lat={lat} lon={lon}>\n\t</wpt>\n')
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(gpx_content)
+        parts.append('</gpx>')
+        gpx_content = ''.join(parts)
         
-        print(f"✓ Extracted {len(waypoints)} waypoints to: {output_file.name}")
+        return [(output_file, self._write_content, (gpx_content.encode('utf-8'),))]
+    
+    def _report_waypoints(self, jobs):
+        """Report the written waypoints file; returns its path (None: no waypoints)"""
+        if not jobs:
+            return None
+        output_file = jobs[0][0]
+        waypoint_count = len(self.top_level.get(self.queries['wpt'], []))
+        self._report(f"✓ Extracted {waypoint_count} waypoints to: {output_file.name}")
         return output_file
     
-    def extract_tracks_enhanced(self, base_name):
-        """Extract each track in clean, compatible format"""
+    @staticmethod
+    def _write_content(output_file, content):
+        """Write prepared file content in one go"""
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(content)
+    
+    def _find_containers(self, tag, kind):
+        """Find the top-level track/route elements, reporting when there are none"""
         # Ensure output_dir is a Path object
-        from pathlib import Path
         if not isinstance(self.output_dir, Path):
             self.output_dir = Path(self.output_dir)
             
-        # Handle namespaced elements
-        if self.namespace.get('default'):
-            tracks = self.root.findall('.//{%s}trk' % self.namespace['default'])
-        else:
-            tracks = self.root.findall('.//trk')
+        containers = self.top_level.get(self.queries[tag], [])
+        
+        if not containers:
+            self._report(f"ℹ No {kind}s found")
+        return containers
+    
+    def _named_output_file(self, name):
+        """Output path for a track/route, using its sanitized name as the filename"""
+        safe_name = _UNSAFE_FILENAME_CHARS.sub('', name).rstrip()
+        safe_name = safe_name.replace(' ', '_')
         
-        if not tracks:
-            print("ℹ No tracks found")
+        return self.output_dir / f"{safe_name}.gpx"
+    
+    def _write_files(self, jobs):
+        """Run write(output_file, *args) for each (output_file, write, args) job on a thread pool.
+        
+        Jobs that target the same file run in order on one thread, so the last one
+        still wins as in a sequential run. That only holds within one call: jobs of
+        different extractors that may share a file (a track and a route with the
+        same name) must be passed together, as extract_components does. Returns
+        the results in job order.
+        """
+        if not jobs:
             return []
         
-        output_files = []
+        by_file = {}
+        for index, (output_file, write, args) in enumerate(jobs):
+            by_file.setdefault(output_file, []).append((index, write, args))
+        
+        results = [None] * len(jobs)
         
+        def write_group(output_file, group):
+            for index, write, args in group:
+                results[index] = write(output_file, *args)
+        
+        # Writes release the GIL, so files are emitted side by side
+        with ThreadPoolExecutor(max_workers=min(len(by_file), os.cpu_count() or 1)) as pool:
+            for future in [pool.submit(write_group, output_file, group)
+                           for output_file, group in by_file.items()]:
+                future.result()
+        return results
+    
+    def extract_tracks_enhanced(self, base_name):
+        """Extract each track in clean, compatible format"""
+        jobs = self._track_jobs()
+        if not jobs:
+            return []
+        return self._report_tracks(jobs, self._write_files(jobs))
+    
+    def _track_jobs(self):
+        """Build one write job per track"""
+        tracks = self._find_containers('trk', 'track')
+        name_query, trkpt_query = self.queries['name'], self.queries['trkpt']
+        
+        jobs = []
         for i, trk in enumerate(tracks, 1):
             # Get track name if available
-            if self.namespace.get('default'):
-                name_elem = trk.find('.//{%s}name' % self.namespace['default'])
-            else:
-                name_elem = trk.find('.//name')
+            name_elem = trk.find(name_query)
             
             track_name = name_elem.text if name_elem is not None else f"track_{i:02d}"
-            
-            # Sanitize filename - use track name directly as output filename
-            safe_name = "".join(c for c in track_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_name = safe_name.replace(' ', '_')
-            
-            output_file = self.output_dir / f"{safe_name}.gpx"
-            
-            # Extract all track points from all segments
-            track_points = []
-            if self.namespace.get('default'):
-                trkpts = trk.findall('.//{%s}trkpt' % self.namespace['default'])
-            else:
-                trkpts = trk.findall('.//trkpt')
-            
-            for trkpt in trkpts:
-                lat = trkpt.get('lat')
-                lon = trkpt.get('lon')
-                if lat and lon:
-                    track_points.append((lat, lon))
-            
-            if track_points:
-                # Create clean, simple GPX content
-                gpx_content = f'''<?xml version="1.0" encoding="UTF-8"?>
+            jobs.append((self._named_output_file(track_name), self._write_track,
+                         (trk, track_name, trkpt_query)))
+        return jobs
+    
+    def _report_tracks(self, jobs, point_counts):
+        """Report the written track files; returns their paths"""
+        output_files = []
+        for i, ((output_file, _, (_, track_name, _)), point_count) in enumerate(zip(jobs, point_counts), 1):
+            if point_count:
+                self._report(f"✓ Extracted track {i}: '{track_name}' ({point_count} points) to: {output_file.name}",
+                             detail=True)
+                output_files.append(output_file)
+        
+        self._report(f"✓ Extracted {len(output_files)} tracks")
+        return output_files
+    
+    def _write_track(self, output_file, trk, track_name, trkpt_query):
+        """Write a single track in clean format; returns its point count (0: nothing written)"""
+        # Extract all track points from all segments in a single pass; the
+        # point count reported is just the length of this list. The raw
+        # attribute values are quoted for the output here as well
+        track_points = [
+            (quoteattr(lat), quoteattr(lon))
+            for trkpt in trk.iterfind(trkpt_query)
+            if (lat := trkpt.get('lat')) and (lon := trkpt.get('lon'))
+        ]
+        
+        if track_points:
+            # Create clean, simple GPX content, collecting the pieces for a single join
+            escaped_name = escape(track_name)
+            parts = [f'''<?xml version="1.0" encoding="UTF-8"?>
 <gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="GPX Extractor">
 \t<metadata>
-\t\t<name>{track_name}</name>
+\t\t<name>{escaped_name}</name>
 \t</metadata>
 \t<trk>
-\t\t<name>{track_name}</name>
+\t\t<name>{escaped_name}</name>
 \t\t<trkseg>
-'''
-                
-                # Add track points
-                for lat, lon in track_points:
-                    gpx_content += f'\t\t\t<trkpt lat="{lat}" lon="{lon}"></trkpt>\n'
-                
-                # Close the GPX structure
-                gpx_content += '''\t\t</trkseg>
+''']
+            
+            # Add track points
+            parts.extend(f'\t\t\t<trkpt lat={lat} lon={lon}></trkpt>\n' for lat, lon in track_points)
+            
+            # Close the GPX structure
+            parts.append('''\t\t</trkseg>
 \t</trk>
-</gpx>'''
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(gpx_content)
-                
-                print(f"✓ Extracted track {i}: '{track_name}' ({len(track_points)} points) to: {output_file.name}")
-                output_files.append(output_file)
+</gpx>''')
+            gpx_content = ''.join(parts)
+            
+            with open(output_file, 'wb', buffering=1 << 20) as f:
+                f.write(gpx_content.encode('utf-8'))
         
-        return output_files
+        return len(track_points)
     
     def extract_routes_enhanced(self, base_name):
         """Extract each route with enhanced naming and analysis"""
-        # Ensure output_dir is a Path object
-        from pathlib import Path
-        if not isinstance(self.output_dir, Path):
-            self.output_dir = Path(self.output_dir)
-            
-        # Handle namespaced elements
-        if self.namespace.get('default'):
-            routes = self.root.findall('.//{%s}rte' % self.namespace['default'])
-        else:
-            routes = self.root.findall('.//rte')
-        
-        if not routes:
-            print("ℹ No routes found")
+        jobs, details = self._route_jobs()
+        if not jobs:
             return []
+        self._write_files(jobs)
+        return self._report_routes(jobs, details)
+    
+    def _route_jobs(self):
+        """Build one write job per route; returns (jobs, [(route name, point count)])"""
+        routes = self._find_containers('rte', 'route')
         
-        output_files = []
-        
-        for i, rte in enumerate(routes, 1):
-            # Get route name if available
-            if self.namespace.get('default'):
-                name_elem = rte.find('.//{%s}name' % self.namespace['default'])
-            else:
-                name_elem = rte.find('.//name')
-            
-            route_name = name_elem.text if name_elem is not None else f"route_{i:02d}"
-            
-            # Sanitize filename - use route name directly as output filename
-            safe_name = "".join(c for c in route_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_name = safe_name.replace(' ', '_')
-            
-            output_file = self.output_dir / f"{safe_name}.gpx"
+        if not routes:
+            return [], []
+        
+        # The header is identical for every route file: build and encode it once
+        header = self.get_gpx_header("route").encode('utf-8')
+        
+        # Copy each route's original bytes straight out of the source file. A single
+        # expat pass over a memory map of the source collects each route's byte
+        # range, name and point count, so nothing is looked up in or re-serialized
+        # from the tree. Fall back to the tree when the source markup can't be
+        # reused as-is (other encoding, DTD, non-1.1 namespace).
+        with ExitStack() as stack:
+            indexed_routes = None
+            if self._can_copy_source_bytes():
+                source = stack.enter_context(open(self.gpx_file_path, 'rb'))
+                source_map = stack.enter_context(mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ))
+                indexed_routes = _SourceElementScanner('rte', 'rtept').scan(source_map)
             
-            # Count route points
-            if self.namespace.get('default'):
-                rtepts = rte.findall('.//{%s}rtept' % self.namespace['default'])
+            # Collect (name, point count, markup) per route, the markup being the
+            # source bytes or the tree element to serialize
+            if indexed_routes is not None and len(indexed_routes) == len(routes):
+                found = [(route['name'], route['points'], _SourceElementScanner.markup(source_map, route))
+                         for route in indexed_routes]
             else:
-                rtepts = rte.findall('.//rtept')
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(self.get_gpx_header("route"))
-                f.write('  ')
-                f.write(ET.tostring(rte, encoding='unicode'))
-                f.write('\n\n</gpx>')
-            
-            print(f"✓ Extracted route {i}: '{route_name}' ({len(rtepts)} points) to: {output_file.name}")
+                name_query, rtept_query = self.queries['name'], self.queries['rtept']
+                found = []
+                for rte in routes:
+                    name_elem = rte.find(name_query)
+                    found.append((name_elem.text if name_elem is not None else None,
+                                  len(rte.findall(rtept_query)), rte))
+        
+        jobs = []
+        details = []
+        for i, (route_name, point_count, route_markup) in enumerate(found, 1):
+            route_name = route_name or f"route_{i:02d}"
+            jobs.append((self._named_output_file(route_name), self._write_route, (route_markup, header)))
+            details.append((route_name, point_count))
+        return jobs, details
+    
+    def _report_routes(self, jobs, details):
+        """Report the written route files; returns their paths"""
+        output_files = []
+        for i, ((output_file, _, _), (route_name, point_count)) in enumerate(zip(jobs, details), 1):
+            self._report(f"✓ Extracted route {i}: '{route_name}' ({point_count} points) to: {output_file.name}",
+                         detail=True)
             output_files.append(output_file)
         
+        self._report(f"✓ Extracted {len(output_files)} routes")
         return output_files
     
+    def _write_route(self, output_file, route_markup, header):
+        """Write a single route's markup (source bytes or a tree element) to its own GPX file"""
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(header)
+            f.write(b'  ')
+            if isinstance(route_markup, bytes):
+                f.write(route_markup)
+            elif HAS_LXML:
+                # Stream the element straight into the file rather than building
+                # the whole serialized route in memory with tostring()
+                with ET.xmlfile(f, encoding='utf-8') as xf:
+                    xf.write(route_markup, with_tail=False)
+            else:
+                # ElementTree always writes the element's tail, so detach it meanwhile
+                tail, route_markup.tail = route_markup.tail, None
+                ET.ElementTree(route_markup).write(f, encoding='utf-8', xml_declaration=False)
+                route_markup.tail = tail
+            f.write(b'\n</gpx>')
+    
     def create_summary(self, waypoint_file, track_files, route_files, base_name):
         """Create a simple summary with extraction information"""
         summary_file = self.output_dir / f"{base_name}_extraction_summary.txt"
         
-        with open(summary_file, 'w') as f:
-            f.write(f"GPX Extraction Summary\n")
-            f.write(f"{"="*50}\n")
-            f.write(f"Source file: {self.gpx_file_path}\n")
-            f.write(f"Extraction date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            f.write(f"📋 Component Counts\n")
-            f.write(f"{'-'*50}\n")
-            f.write(f"Waypoints: {self.metadata.get('waypoint_count', 0)}\n")
-            f.write(f"Tracks: {self.metadata.get('track_count', 0)}\n")
-            f.write(f"Routes: {self.metadata.get('route_count', 0)}\n")
-            
-            f.write(f"\n📁 Extracted Files\n")
-            f.write(f"{'-'*50}\n")
-            if waypoint_file:
-                f.write(f"Waypoints file: {waypoint_file.name}\n")
-            else:
-                f.write("Waypoints: None found\n")
-            
-            f.write(f"\nTracks extracted: {len(track_files)}\n")
-            for track_file in track_files:
-                f.write(f"  - {track_file.name}\n")
-            
-            f.write(f"\nRoutes extracted: {len(route_files)}\n")
-            for route_file in route_files:
-                f.write(f"  - {route_file.name}\n")
-                
-            f.write(f"\n🔧 Technical Details\n")
-            f.write(f"{'-'*50}\n")
-            f.write(f"Namespace: {self.namespace.get('default', 'None')}\n")
-            f.write(f"GPX version: {self.metadata.get('version', 'Unknown')}\n")
-            if self.metadata.get('build_date'):
-                f.write(f"Build date: {self.metadata['build_date']}\n")
+        # Build the whole summary up front and write it in one go
+        rule = '-' * 50
+        parts = [
+            "GPX Extraction Summary",
+            '=' * 50,
+            f"Source file: {self.gpx_file_path}",
+            f"Source fingerprint: {self.metadata.get('file_digest', 'N/A')}",
+            f"Extraction date: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            "",
+            "📋 Component Counts",
+            rule,
+            f"Waypoints: {self.metadata.get('waypoint_count', 0)}",
+            f"Tracks: {self.metadata.get('track_count', 0)}",
+            f"Routes: {self.metadata.get('route_count', 0)}",
+            "",
+            "📁 Extracted Files",
+            rule,
+            f"Waypoints file: {waypoint_file.name}" if waypoint_file else "Waypoints: None found",
+            "",
+            f"Tracks extracted: {len(track_files)}",
+        ]
+        parts.extend(f"  - {track_file.name}" for track_file in track_files)
+        parts += ["", f"Routes extracted: {len(route_files)}"]
+        parts.extend(f"  - {route_file.name}" for route_file in route_files)
+        parts += [
+            "",
+            "🔧 Technical Details",
+            rule,
+            f"Namespace: {self.namespace.get('default', 'None')}",
+            f"GPX version: {self.metadata.get('version', 'Unknown')}",
+        ]
+        if self.metadata.get('build_date'):
+            parts.append(f"Build date: {self.metadata['build_date']}")
+        parts.append("")
+        
+        summary_file.write_text('\n'.join(parts), encoding='utf-8')
+        self._record_version()
         
         print(f"✓ Created enhanced extraction summary: {summary_file}")
         return summary_file
     
+    def extract_components(self, base_name):
+        """Extract waypoints, tracks and routes; returns (waypoint_file, track_files, route_files)"""
+        waypoint_jobs = self._waypoint_jobs(base_name)
+        track_jobs = self._track_jobs()
+        route_jobs, route_details = self._route_jobs()
+        
+        # Tracks and routes are named after their <name>, and TET/Garmin exports
+        # often give a track and a route the same one, so different components
+        # can target the same file. All writes therefore go through one
+        # _write_files call, which runs same-file jobs in this order (waypoints,
+        # tracks, routes) on one thread: the route wins, as in a sequential run.
+        results = self._write_files(waypoint_jobs + track_jobs + route_jobs)
+        track_results = results[len(waypoint_jobs):len(waypoint_jobs) + len(track_jobs)]
+        
+        waypoint_file = self._report_waypoints(waypoint_jobs)
+        track_files = self._report_tracks(track_jobs, track_results) if track_jobs else []
+        route_files = self._report_routes(route_jobs, route_details) if route_jobs else []
+        return waypoint_file, track_files, route_files
+    
     def extract_all(self):
         """Extract all components with enhanced naming and version detection"""
         if not self.load_gpx():
@@ -695,9 +1046,8 @@ class GPXExtractor:
         print("-" * 60)
         
         # Extract each component using the base name
-        waypoint_file = self.extract_waypoints_enhanced(base_name)
-        track_files = self.extract_tracks_enhanced(base_name)
-        route_files = self.extract_routes_enhanced(base_name)
+        waypoint_file, track_files, route_files = self.extract_components(base_name)
+        self.flush_report()
         
         # Create enhanced summary
         summary_file = self.create_summary(waypoint_file, track_files, route_files, base_name)
@@ -744,7 +1094,7 @@ Examples:
         output_dir = gpx_file.parent / f"{gpx_file.stem}_extracted"
     
     # Extract components
-    extractor = GPXExtractor(gpx_file, output_dir)
+    extractor = GPXExtractor(gpx_file, output_dir, verbose=args.verbose)
     success = extractor.extract_all()
     
     if success:
@@ -13,22 +13,42 @@ import zipfile
 import socket
 import json
 import hashlib
-import threading
 import time
 import uuid
+import queue
+import threading
+import multiprocessing
 from pathlib import Path
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.exceptions import NotFound
 from werkzeug.middleware.proxy_fix import ProxyFix
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
-import tempfile
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, Response, stream_with_context
 import shutil
 from datetime import datetime
-from xml.etree import ElementTree as ET
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# orjson (de)serializes the metadata sidecars several times faster; fall back
+# to the standard library json module when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# gunicorn serves the app in production; without it (or with FLASK_DEV=1) the
+# Werkzeug development server is used
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
 
 # Add the parent directory to sys.path to import gpx_extractor
 sys.path.append(str(Path(__file__).parent.parent))
-from gpx_extractor import GPXExtractor, GPXMetadataExtractor
+from gpx_extractor import GPXExtractor, GPXMetadataExtractor, new_source_hash
 
 app = Flask(__name__)
 # Handle reverse proxy headers correctly
@@ -46,14 +66,35 @@ METADATA_FOLDER = Path(__file__).parent / 'metadata'  # Store file metadata
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 PROCESSED_FOLDER.mkdir(exist_ok=True)
 METADATA_FOLDER.mkdir(exist_ok=True)
+PROCESSED_ROOT = os.path.realpath(PROCESSED_FOLDER)  # resolved once for the path checks
 
 ALLOWED_EXTENSIONS = {'gpx'}
+SHORT_NAME_PATTERN = re.compile(r'(TET_[A-Z]{1,3}-\d+_\d{8})')  # e.g. TET_D-01_20241001
 DELETE_TOKEN = 'NXeurology-Unwitting5-Ut]nworn'  # Secure delete token
 
 # Background processing setup
-processing_jobs = {}  # Store job status and results
-job_lock = threading.Lock()
+# Store job status and results. Each job is a plain dict that is only ever
+# changed with single dict operations (insert, update, copy, pop), which are
+# atomic under the GIL, so status updates and polling need no shared lock.
+# Jobs are kept in start order and the oldest finished ones are dropped once
+# more than MAX_TRACKED_JOBS exist, which bounds memory without sweeping by age.
+processing_jobs = OrderedDict()
+MAX_TRACKED_JOBS = 256
 executor = ThreadPoolExecutor(max_workers=2)  # Limit concurrent processing
+# The extraction itself is CPU-bound, so it runs in worker processes; the
+# executor threads above only coordinate and report progress. Workers come from
+# a forkserver, as forking this threaded process could copy held locks into them
+_mp_context = multiprocessing.get_context('forkserver')
+process_pool = ProcessPoolExecutor(max_workers=2, mp_context=_mp_context)
+_process_pool_lock = threading.Lock()  # Guards process_pool and _progress_manager
+_progress_manager = None
+# Open /progress streams per job; update_job_status pushes each change into
+# every queue registered for the job
+job_listeners = {}
+PROGRESS_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+# Sent to the streams of a job that was dropped from processing_jobs
+JOB_GONE_EVENT = {'status': 'error', 'progress': 0, 'message': 'Job not found',
+                  'error': 'This job is no longer tracked. Please upload the file again.'}
 
 @app.errorhandler(413)
 def request_entity_too_large(_error):
@@ -68,13 +109,22 @@ def allowed_file(filename):
     """Check if the uploaded file has an allowed extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_upload(file, path):
+    """Save an uploaded file and return its source fingerprint, hashed while writing"""
+    digest = new_source_hash()
+    with open(path, 'wb') as out:
+        while chunk := file.stream.read(1 << 20):
+            out.write(chunk)
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def extract_short_name(filename_stem):
     """Extract short TET-style name from filename.
     e.g. 'TET_Sweden_v20200619_track_01_TET_D-01_20241001_S01' -> 'TET_D-01_20241001'
     Falls back to the original stem if no pattern matches.
     """
     # Match pattern like TET_XX-##_YYYYMMDD anywhere in the filename
-    match = re.search(r'(TET_[A-Z]{1,3}-\d+_\d{8})', filename_stem)
+    match = SHORT_NAME_PATTERN.search(filename_stem)
     if match:
         return match.group(1)
     return filename_stem
@@ -98,9 +148,105 @@ def get_file_display_name(metadata, original_filename):
     else:
         return clean_name
 
+def dumps_json(obj):
+    """Serialize to indented UTF-8 JSON bytes"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+def loads_json(data):
+    """Parse JSON from bytes"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Parsed metadata sidecars keyed by filename, with the (mtime_ns, size, inode)
+# they were read at; every write replaces the file, so the inode always changes
+_metadata_cache = {}
+
+def read_metadata_file(metadata_file):
+    """Read a metadata sidecar (Path or os.DirEntry), reusing the parsed copy while the file is unchanged"""
+    stat = metadata_file.stat()
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _metadata_cache.get(metadata_file.name)
+    if cached is None or cached[0] != key:
+        with open(metadata_file, 'rb') as f:
+            cached = _metadata_cache[metadata_file.name] = (key, loads_json(f.read()))
+    # Callers update top-level fields before saving, so hand out a copy
+    return dict(cached[1])
+
+# All parsed sidecars, keyed by the metadata folder's mtime. Sidecars are only
+# ever created, replaced or deleted as directory entries, each of which bumps
+# that mtime, so an unchanged folder needs one stat() instead of a listing.
+# A write can land in the same mtime tick as a rebuild, so the key also holds
+# a generation that this process bumps after each of its own writes.
+# Holds ((mtime_ns, generation), file_infos, {clean_name: file_info}).
+_metadata_listing = None
+_metadata_generation = 0
+_metadata_generation_lock = threading.Lock()
+
+def _metadata_changed():
+    """Invalidate the sidecar listing after a sidecar was written or removed"""
+    global _metadata_generation
+    with _metadata_generation_lock:
+        _metadata_generation += 1
+
+def _current_metadata_listing():
+    """Return the cached sidecar listing, re-reading it if the folder changed"""
+    global _metadata_listing
+    # Generation first, so a write that finishes during the scan below is
+    # newer than the key the listing gets stored under
+    generation = _metadata_generation
+    key = (METADATA_FOLDER.stat().st_mtime_ns, generation)
+    listing = _metadata_listing
+    if listing is None or listing[0] != key:
+        file_infos = []
+        by_clean_name = {}
+        seen = set()
+        with os.scandir(METADATA_FOLDER) as entries:
+            metadata_files = [entry for entry in entries if entry.name.endswith('.json')]
+        for metadata_file in metadata_files:
+            seen.add(metadata_file.name)
+            try:
+                file_info = read_metadata_file(metadata_file)
+            except:
+                continue
+            file_infos.append(file_info)
+            by_clean_name.setdefault(file_info.get('clean_name'), file_info)
+        
+        # Forget sidecars that have been removed in the meantime
+        for name in _metadata_cache.keys() - seen:
+            _metadata_cache.pop(name, None)
+        
+        listing = _metadata_listing = (key, file_infos, by_clean_name)
+    return listing
+
+def list_metadata_files():
+    """Return the parsed contents of every metadata sidecar"""
+    return [dict(file_info) for file_info in _current_metadata_listing()[1]]
+
+def write_metadata_file(unique_id, file_info):
+    """Write a metadata sidecar and drop any cached copy of it"""
+    metadata_file = METADATA_FOLDER / f"{unique_id}.json"
+    # Replace the sidecar in one step, so readers never see a partial file and
+    # the folder's mtime changes. Each write gets its own temp file, so e.g. a
+    # finishing job and a description edit can't swap in each other's half
+    temp_file = METADATA_FOLDER / f"{unique_id}.json.{uuid.uuid4().hex}.tmp"
+    temp_file.write_bytes(dumps_json(file_info))
+    os.replace(temp_file, metadata_file)
+    _metadata_cache.pop(metadata_file.name, None)
+    _metadata_changed()
+
+def remove_metadata_file(unique_id):
+    """Delete a metadata sidecar and its cached copy"""
+    metadata_file = METADATA_FOLDER / f"{unique_id}.json"
+    if metadata_file.exists():
+        metadata_file.unlink()
+    _metadata_cache.pop(metadata_file.name, None)
+    _metadata_changed()
+
 def save_file_metadata(unique_id, metadata, original_filename, file_path):
     """Save file metadata for management purposes"""
-    metadata_file = METADATA_FOLDER / f"{unique_id}.json"
     file_info = {
         'unique_id': unique_id,
         'original_filename': original_filename,
@@ -112,8 +258,7 @@ def save_file_metadata(unique_id, metadata, original_filename, file_path):
         'description': ''
     }
     
-    with open(metadata_file, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    write_metadata_file(unique_id, file_info)
     
     return file_info
 
@@ -124,11 +269,32 @@ def load_file_metadata(unique_id):
         return None
     
     try:
-        with open(metadata_file, 'r') as f:
-            return json.load(f)
+        return read_metadata_file(metadata_file)
     except:
         return None
 
+def resolve_output_dir(directory):
+    """Return the output directory named in a request, or None if it isn't inside PROCESSED_FOLDER"""
+    path = os.path.realpath(os.path.join(PROCESSED_ROOT, directory))
+    if path == PROCESSED_ROOT or os.path.commonpath([path, PROCESSED_ROOT]) != PROCESSED_ROOT:
+        return None
+    return Path(path)
+
+@lru_cache(maxsize=256)
+def _scan_result_files(output_dir, mtime_ns):
+    """Return (name, size) of the .gpx files in output_dir, sorted by name"""
+    with os.scandir(output_dir) as entries:
+        return tuple(sorted((entry.name, entry.stat().st_size)
+                            for entry in entries if entry.name.endswith('.gpx')))
+
+def list_result_files(output_dir):
+    """Return (name, size) of the .gpx files in an output directory.
+
+    Scans are cached per directory mtime. The summary is written after all
+    parts, so a finished extraction always gets a fresh scan.
+    """
+    return _scan_result_files(str(output_dir), os.stat(output_dir).st_mtime_ns)
+
 def build_results_from_directory(file_info):
     """Reconstruct results dict from an already-processed output directory."""
     output_dir_name = file_info.get('output_directory')
@@ -139,8 +305,8 @@ def build_results_from_directory(file_info):
         return None
 
     extracted_files = []
-    for gpx_file in sorted(output_dir.glob('*.gpx')):
-        name_lower = gpx_file.name.lower()
+    for name, size in list_result_files(output_dir):
+        name_lower = name.lower()
         if 'waypoint' in name_lower:
             ftype = 'waypoints'
         elif 'route' in name_lower:
@@ -148,8 +314,8 @@ def build_results_from_directory(file_info):
         else:
             ftype = 'track'
         extracted_files.append({
-            'name': gpx_file.name,
-            'size': gpx_file.stat().st_size,
+            'name': name,
+            'size': size,
             'type': ftype,
             'count': 0,
         })
@@ -183,17 +349,11 @@ def get_available_files():
     """Get list of available uploaded files with metadata"""
     available_files = []
     
-    for metadata_file in METADATA_FOLDER.glob('*.json'):
-        try:
-            with open(metadata_file, 'r') as f:
-                file_info = json.load(f)
-                
-            # Check if the actual file still exists
-            file_path = Path(file_info.get('file_path', ''))
-            if file_path.exists():
-                available_files.append(file_info)
-        except:
-            continue
+    for file_info in list_metadata_files():
+        # Check if the actual file still exists
+        file_path = Path(file_info.get('file_path', ''))
+        if file_path.exists():
+            available_files.append(file_info)
     
     # Sort by upload date, newest first
     available_files.sort(key=lambda x: x.get('upload_date', ''), reverse=True)
@@ -216,32 +376,36 @@ def is_newer_version(existing_metadata, new_metadata):
 
 def find_existing_file(clean_name):
     """Find existing file with same clean name"""
-    for metadata_file in METADATA_FOLDER.glob('*.json'):
-        try:
-            with open(metadata_file, 'r') as f:
-                file_info = json.load(f)
-                
-            if file_info.get('clean_name') == clean_name:
-                return file_info
-        except:
-            continue
-    return None
+    file_info = _current_metadata_listing()[2].get(clean_name)
+    return dict(file_info) if file_info is not None else None
+
+def evict_old_jobs():
+    """Drop the oldest jobs beyond MAX_TRACKED_JOBS, finished ones before running ones"""
+    while len(processing_jobs) > MAX_TRACKED_JOBS:
+        # list() takes the snapshot in one step, as other threads add jobs too
+        jobs = list(processing_jobs.items())
+        job_id = next((job_id for job_id, job in jobs if job['status'] != 'processing'),
+                      jobs[0][0])
+        processing_jobs.pop(job_id, None)
+        # A job still running can't report anymore; end its progress streams
+        for listener in job_listeners.get(job_id, ()):
+            listener.put(JOB_GONE_EVENT)
 
 def start_background_processing(file_path, original_filename, existing_metadata=None, unique_id=None):
     """Start background processing and return job ID"""
     job_id = str(uuid.uuid4())
     print(f"Creating new job with ID: {job_id} for file: {original_filename}", flush=True)
     
-    with job_lock:
-        processing_jobs[job_id] = {
-            'status': 'processing',
-            'progress': 0,
-            'message': 'Starting GPX processing...',
-            'start_time': datetime.now().isoformat(),
-            'result': None,
-            'error': None
-        }
-        print(f"Job {job_id} added to processing_jobs. Total jobs: {len(processing_jobs)}", flush=True)
+    processing_jobs[job_id] = {
+        'status': 'processing',
+        'progress': 0,
+        'message': 'Starting GPX processing...',
+        'start_time': datetime.now().isoformat(),
+        'result': None,
+        'error': None
+    }
+    evict_old_jobs()
+    print(f"Job {job_id} added to processing_jobs. Total jobs: {len(processing_jobs)}", flush=True)
     
     # Submit job to executor
     future = executor.submit(background_process_gpx, job_id, file_path, original_filename, existing_metadata, unique_id)
@@ -249,157 +413,263 @@ def start_background_processing(file_path, original_filename, existing_metadata=
     
     return job_id
 
+class JobError(Exception):
+    """Processing failure with a user-facing message and a short error label"""
+
+    def __init__(self, message, error):
+        super().__init__(message, error)
+        self.message = message
+        self.error = error
+
+def extract_gpx_job(file_path, original_filename, existing_metadata, progress):
+    """Extract one GPX file and return the job result.
+
+    Runs in a worker process of process_pool so parsing and writing the parts
+    don't compete with the web threads for the GIL; progress is a queue that
+    receives (percent, message) tuples for the coordinating thread.
+    """
+    # Extract GPX components with enhanced metadata; the stored metadata carries
+    # the fingerprint taken at upload, so the file needn't be hashed again
+    extractor = GPXExtractor(file_path, PROCESSED_FOLDER,
+                             file_digest=(existing_metadata or {}).get('file_digest'))
+    
+    # Load GPX, reusing the metadata analysed at upload (or stored for selected
+    # files) instead of analysing the tree a second time
+    if not extractor.load_gpx(existing_metadata):
+        raise JobError('Error processing GPX file. Please check the file format.', 'Invalid GPX format')
+    
+    progress.put((20, 'Analyzing GPX structure...'))
+    
+    # Check for existing versions
+    has_similar, similar_files = extractor.check_existing_version()
+    
+    progress.put((40, 'Preparing output directory...'))
+    
+    # Use simple base name for extraction
+    base_name = Path(original_filename).stem
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    output_dir = PROCESSED_FOLDER / f"{timestamp}_{base_name}_extracted"
+    extractor.output_dir = output_dir
+    output_dir.mkdir(exist_ok=True)
+    
+    progress.put((50, 'Extracting waypoints, tracks and routes...'))
+    
+    # Extract components. Writes run on a thread pool, but a track and a route
+    # with the same name share a file, so extract_components runs those writes
+    # in order on one thread
+    waypoint_file, track_files, route_files = extractor.extract_components(base_name)
+    extractor.flush_report()
+    
+    progress.put((95, 'Creating summary...'))
+    
+    # Create enhanced summary
+    summary_file = extractor.create_summary(waypoint_file, track_files, route_files, base_name)
+    
+    if not waypoint_file and not track_files and not route_files:
+        raise JobError('No extractable content found in GPX file.', 'No extractable content')
+    
+    # Get list of extracted files with enhanced information
+    extracted_files = []
+    
+    if waypoint_file:
+        file_info = {
+            'name': waypoint_file.name,
+            'size': waypoint_file.stat().st_size,
+            'type': 'waypoints',
+            'count': extractor.metadata['waypoint_count']
+        }
+        extracted_files.append(file_info)
+    
+    for track_file in track_files:
+        file_info = {
+            'name': track_file.name,
+            'size': track_file.stat().st_size,
+            'type': 'track',
+            'count': 0  # Could extract track point count if needed
+        }
+        extracted_files.append(file_info)
+    
+    for route_file in route_files:
+        file_info = {
+            'name': route_file.name,
+            'size': route_file.stat().st_size,
+            'type': 'route',
+            'count': 0  # Could extract route point count if needed
+        }
+        extracted_files.append(file_info)
+    
+    # Sort files by type and name
+    extracted_files.sort(key=lambda x: (x['type'], x['name']))
+    
+    # Read summary file for display
+    summary_content = summary_file.read_text() if summary_file.exists() else ""
+    
+    # Prepare enhanced metadata for display
+    enhanced_metadata = {
+        'trail_type': extractor.metadata.get('trail_type'),
+        'section_markers': extractor.metadata.get('section_markers', []),
+        'latest_modification': extractor.metadata.get('latest_modification'),
+        'creator': extractor.metadata.get('creator'),
+        'content_hash': extractor.metadata.get('content_hash'),
+        'suggested_name': base_name,
+        'similar_versions': similar_files if has_similar else None
+    }
+    
+    # Store results
+    result = {
+        'extracted_files': extracted_files,
+        'original_filename': original_filename,
+        'output_directory': output_dir.name,
+        'summary': summary_content,
+        'enhanced_metadata': enhanced_metadata,
+        'metadata': extractor.metadata
+    }
+    
+    return result
+
+def _job_progress_queue():
+    """Return a queue the worker processes can report progress through"""
+    global _progress_manager
+    # Under the pool lock so jobs starting together share one Manager
+    with _process_pool_lock:
+        if _progress_manager is None:
+            _progress_manager = _mp_context.Manager()
+        try:
+            return _progress_manager.Queue()
+        except (OSError, EOFError):
+            # The Manager process died; shut down what's left and start a new one
+            _progress_manager.shutdown()
+            _progress_manager = _mp_context.Manager()
+            return _progress_manager.Queue()
+
+def _replace_broken_pool(pool):
+    """Swap in a fresh process pool after a worker died, unless another job already did"""
+    global process_pool
+    with _process_pool_lock:
+        if process_pool is pool:
+            process_pool = ProcessPoolExecutor(max_workers=2, mp_context=_mp_context)
+    pool.shutdown(wait=False)
+
 def background_process_gpx(job_id, file_path, original_filename, existing_metadata=None, unique_id=None):
-    """Process GPX file in background thread"""
+    """Run extract_gpx_job in the process pool and relay its progress to the job status"""
     try:
         # Update status
         update_job_status(job_id, 10, 'Loading GPX file...')
         
-        # Extract GPX components with enhanced metadata
-        extractor = GPXExtractor(file_path, PROCESSED_FOLDER)
-        
-        # Load GPX to get metadata before extracting
-        if not extractor.load_gpx():
-            update_job_status(job_id, 0, 'Error processing GPX file. Please check the file format.', 
-                            status='error', error='Invalid GPX format')
-            return
-        
-        update_job_status(job_id, 20, 'Analyzing GPX structure...')
-        
-        # Use existing metadata if provided (for selected files)
-        if existing_metadata:
-            extractor.metadata.update(existing_metadata)
-        
-        # Check for existing versions
-        has_similar, similar_files = extractor.check_existing_version()
-        
-        update_job_status(job_id, 40, 'Preparing output directory...')
-        
-        # Use simple base name for extraction
-        base_name = Path(original_filename).stem
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_dir = PROCESSED_FOLDER / f"{timestamp}_{base_name}_extracted"
-        extractor.output_dir = output_dir
-        output_dir.mkdir(exist_ok=True)
-        
-        update_job_status(job_id, 50, 'Extracting waypoints...')
-        
-        # Extract components
-        waypoint_file = extractor.extract_waypoints_enhanced(base_name)
-        
-        update_job_status(job_id, 70, 'Extracting tracks...')
-        track_files = extractor.extract_tracks_enhanced(base_name) 
-        
-        update_job_status(job_id, 85, 'Extracting routes...')
-        route_files = extractor.extract_routes_enhanced(base_name)
-        
-        update_job_status(job_id, 95, 'Creating summary...')
-        
-        # Create enhanced summary
-        summary_file = extractor.create_summary(waypoint_file, track_files, route_files, base_name)
-        
-        if not waypoint_file and not track_files and not route_files:
-            update_job_status(job_id, 0, 'No extractable content found in GPX file.',
-                            status='error', error='No extractable content')
-            return
-        
-        # Get list of extracted files with enhanced information
-        extracted_files = []
-        
-        if waypoint_file:
-            file_info = {
-                'name': waypoint_file.name,
-                'size': waypoint_file.stat().st_size,
-                'type': 'waypoints',
-                'count': extractor.metadata['waypoint_count']
-            }
-            extracted_files.append(file_info)
-        
-        for track_file in track_files:
-            file_info = {
-                'name': track_file.name,
-                'size': track_file.stat().st_size,
-                'type': 'track',
-                'count': 0  # Could extract track point count if needed
-            }
-            extracted_files.append(file_info)
-        
-        for route_file in route_files:
-            file_info = {
-                'name': route_file.name,
-                'size': route_file.stat().st_size,
-                'type': 'route',
-                'count': 0  # Could extract route point count if needed
-            }
-            extracted_files.append(file_info)
-        
-        # Sort files by type and name
-        extracted_files.sort(key=lambda x: (x['type'], x['name']))
-        
-        # Read summary file for display
-        summary_content = summary_file.read_text() if summary_file.exists() else ""
-        
-        # Prepare enhanced metadata for display
-        enhanced_metadata = {
-            'trail_type': extractor.metadata.get('trail_type'),
-            'section_markers': extractor.metadata.get('section_markers', []),
-            'latest_modification': extractor.metadata.get('latest_modification'),
-            'creator': extractor.metadata.get('creator'),
-            'content_hash': extractor.metadata.get('content_hash'),
-            'suggested_name': base_name,
-            'similar_versions': similar_files if has_similar else None
-        }
-        
-        # Store results
-        result = {
-            'extracted_files': extracted_files,
-            'original_filename': original_filename,
-            'output_directory': output_dir.name,
-            'summary': summary_content,
-            'enhanced_metadata': enhanced_metadata,
-            'metadata': extractor.metadata
-        }
-        
+        progress = _job_progress_queue()
+        pool = process_pool
+        future = pool.submit(extract_gpx_job, str(file_path), original_filename,
+                             existing_metadata, progress)
+        while True:
+            try:
+                percent, message = progress.get(timeout=0.5)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            update_job_status(job_id, percent, message)
+        
+        result = future.result()
         update_job_status(job_id, 100, 'Processing complete!', status='completed', result=result)
 
         # Persist output_directory in file metadata so we can serve existing results later
         if unique_id:
             file_meta = load_file_metadata(unique_id)
             if file_meta:
-                file_meta['output_directory'] = output_dir.name
-                metadata_file_path = METADATA_FOLDER / f"{unique_id}.json"
-                with open(metadata_file_path, 'w') as mf:
-                    json.dump(file_meta, mf, indent=2)
+                file_meta['output_directory'] = result['output_directory']
+                write_metadata_file(unique_id, file_meta)
 
+    except JobError as e:
+        update_job_status(job_id, 0, e.message, status='error', error=e.error)
+    except BrokenProcessPool as e:
+        # A worker was killed (e.g. out of memory); the pool accepts no more
+        # jobs, so later uploads need a new one
+        _replace_broken_pool(pool)
+        update_job_status(job_id, 0, 'Processing was interrupted. Please try again.',
+                        status='error', error=str(e))
     except Exception as e:
         update_job_status(job_id, 0, f'Error processing file: {str(e)}',
                         status='error', error=str(e))
 
 def update_job_status(job_id, progress, message, status=None, result=None, error=None):
     """Update job status in thread-safe manner"""
-    with job_lock:
-        if job_id in processing_jobs:
-            processing_jobs[job_id]['progress'] = progress
-            processing_jobs[job_id]['message'] = message
-            processing_jobs[job_id]['last_update'] = datetime.now().isoformat()
-            
-            if status:
-                processing_jobs[job_id]['status'] = status
-            if result:
-                processing_jobs[job_id]['result'] = result
-            if error:
-                processing_jobs[job_id]['error'] = error
+    job = processing_jobs.get(job_id)
+    if job is None:
+        return
+    
+    changes = {
+        'progress': progress,
+        'message': message,
+        'last_update_ns': time.time_ns()  # formatted only when /job-status is polled
+    }
+    if status:
+        changes['status'] = status
+    if result:
+        changes['result'] = result
+    if error:
+        changes['error'] = error
+    
+    # One update() call, so pollers never see e.g. 'completed' without its result
+    job.update(changes)
+    
+    event = progress_event(job)
+    for listener in job_listeners.get(job_id, ()):
+        listener.put(event)
+
+def progress_event(job):
+    """Return the part of a job's status that is streamed to the processing page"""
+    return {key: job.get(key) for key in ('status', 'progress', 'message', 'error')}
 
 @app.route('/job-status/<job_id>')
 def get_job_status(job_id):
     """Get status of background processing job"""
-    with job_lock:
-        if job_id not in processing_jobs:
-            return jsonify({'error': 'Job not found'}), 404
-        
-        job = processing_jobs[job_id].copy()
+    job = processing_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    status = job.copy()
+    last_update_ns = status.pop('last_update_ns', None)
+    if last_update_ns is not None:
+        status['last_update'] = datetime.fromtimestamp(last_update_ns / 1e9).isoformat()
+    return jsonify(status)
+
+@app.route('/progress/<job_id>')
+def stream_job_progress(job_id):
+    """Stream job status changes as Server-Sent Events until the job finishes"""
+    job = processing_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    listener = queue.Queue()
+    job_listeners.setdefault(job_id, []).append(listener)
+    
+    def generate():
+        try:
+            # Current state first, in case the job moved on before we subscribed
+            event = progress_event(job)
+            while True:
+                yield f"data: {json.dumps(event)}\n\n"
+                if event['status'] != 'processing':
+                    break
+                while True:
+                    try:
+                        event = listener.get(timeout=PROGRESS_HEARTBEAT)
+                        break
+                    except queue.Empty:
+                        if job_id not in processing_jobs:
+                            event = JOB_GONE_EVENT
+                            break
+                        # SSE comment line, keeps proxies from closing an idle stream
+                        yield ": ping\n\n"
+        finally:
+            listeners = job_listeners.get(job_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                job_listeners.pop(job_id, None)
     
-    return jsonify(job)
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/job-result-direct/<unique_id>')
 def get_job_result_direct(unique_id):
@@ -425,21 +695,20 @@ def get_job_result_direct(unique_id):
 @app.route('/job-result/<job_id>')
 def get_job_result(job_id):
     """Get result page for completed job"""
-    with job_lock:
-        if job_id not in processing_jobs:
-            flash('Processing job not found', 'error')
-            return redirect('/extract-gpx-parts/')
-        
-        job = processing_jobs[job_id]
-        
-        if job['status'] != 'completed' or not job.get('result'):
-            flash('Job not completed or result not available', 'error')
-            return redirect('/extract-gpx-parts/')
-        
-        result = job['result']
-        
-        # Clean up job after retrieving result
-        del processing_jobs[job_id]
+    job = processing_jobs.get(job_id)
+    if job is None:
+        flash('Processing job not found', 'error')
+        return redirect('/extract-gpx-parts/')
+    
+    job = job.copy()
+    if job['status'] != 'completed' or not job.get('result'):
+        flash('Job not completed or result not available', 'error')
+        return redirect('/extract-gpx-parts/')
+    
+    result = job['result']
+    
+    # Clean up job after retrieving result
+    processing_jobs.pop(job_id, None)
     
     return render_template('results.html', 
                          extracted_files=result['extracted_files'],
@@ -449,38 +718,48 @@ def get_job_result(job_id):
                          enhanced_metadata=result['enhanced_metadata'],
                          metadata=result['metadata'])
 
-def cleanup_old_jobs():
-    """Remove old job records to prevent memory leaks"""
-    try:
-        with job_lock:
-            current_time = datetime.now()
-            jobs_to_delete = []
-            
-            for job_id, job_data in processing_jobs.items():
-                start_time = datetime.fromisoformat(job_data['start_time'])
-                # Remove jobs older than 1 hour
-                if (current_time - start_time).total_seconds() > 3600:
-                    jobs_to_delete.append(job_id)
-            
-            for job_id in jobs_to_delete:
-                del processing_jobs[job_id]
-                
-    except Exception as e:
-        print(f"Job cleanup error: {e}")
+def iter_expired_files(folder, cutoff):
+    """Recursively yield paths of files below folder last modified before cutoff"""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_expired_files(entry.path, cutoff)
+            elif entry.name.endswith('.lock'):
+                continue  # Held by extractions; removing it would split the lock
+            elif entry.is_file() and entry.stat().st_mtime < cutoff:
+                yield entry.path
 
 def cleanup_old_files():
     """Remove old processed files to free up disk space"""
     try:
         # Remove files older than 1 hour
-        import time
-        current_time = time.time()
+        cutoff = time.time() - 3600
         for folder in [UPLOAD_FOLDER, PROCESSED_FOLDER, METADATA_FOLDER]:
-            for file_path in folder.glob('**/*'):
-                if file_path.is_file() and (current_time - file_path.stat().st_mtime) > 3600:
-                    file_path.unlink()
+            # Collect first so the directories aren't modified while being scanned
+            for file_path in list(iter_expired_files(folder, cutoff)):
+                os.unlink(file_path)
+        _metadata_changed()
     except Exception as e:
         print(f"Cleanup error: {e}")
 
+def cleanup_periodically():
+    """Sweep expired files every CLEANUP_INTERVAL seconds (runs in a daemon thread)"""
+    while True:
+        cleanup_old_files()
+        time.sleep(CLEANUP_INTERVAL)
+
+# Sweep in the background rather than on page loads
+CLEANUP_INTERVAL = 300
+
+def start_cleanup_thread():
+    """Start the cleanup sweep; only the process serving requests calls this.
+    
+    Pool workers and the progress Manager re-import this module as __mp_main__
+    (under forkserver), so starting the thread at import time would give each
+    of them a sweeper of its own.
+    """
+    threading.Thread(target=cleanup_periodically, name='cleanup', daemon=True).start()
+
 def find_available_port(start_port=6001, max_port=6100):
     """Find an available port starting from start_port"""
     for port in range(start_port, max_port + 1):
@@ -495,7 +774,9 @@ def find_available_port(start_port=6001, max_port=6100):
 
 @app.route('/favicon.ico')
 def favicon():
-    return send_file(Path(__file__).parent / 'static' / 'favicon.ico', mimetype='image/x-icon')
+    # Cacheable for a day; after that the ETag turns repeat requests into 304s
+    return send_file(Path(__file__).parent / 'static' / 'favicon.ico', mimetype='image/x-icon',
+                     max_age=86400)
 
 @app.route('/shared/shared-styles.css')
 def shared_styles():
@@ -511,8 +792,6 @@ def shared_styles():
 @app.route('/')
 def index():
     """Main upload page with available files list"""
-    cleanup_old_files()
-    cleanup_old_jobs()  # Clean up old processing jobs
     available_files = get_available_files()
     return render_template(
         'index.html',
@@ -551,8 +830,7 @@ def select_file():
         job_id = start_background_processing(file_path, file_info['original_filename'], file_info['metadata'], unique_id=unique_id)
         print(f"Started background processing with job_id: {job_id}", flush=True)
         
-        with job_lock:
-            print(f"Processing jobs after starting: {list(processing_jobs.keys())}", flush=True)
+        print(f"Processing jobs after starting: {list(processing_jobs)}", flush=True)
         
         return jsonify({
             'job_id': job_id,
@@ -577,9 +855,7 @@ def update_description():
     if not file_info:
         return jsonify({'error': 'File not found'}), 404
     file_info['description'] = description
-    metadata_file = METADATA_FOLDER / f"{unique_id}.json"
-    with open(metadata_file, 'w') as f:
-        json.dump(file_info, f, indent=2)
+    write_metadata_file(unique_id, file_info)
     return jsonify({'success': True})
 
 @app.route('/delete-file', methods=['POST'])
@@ -602,108 +878,13 @@ def delete_file():
             file_path.unlink()
         
         # Delete metadata file
-        metadata_file = METADATA_FOLDER / f"{unique_id}.json"
-        if metadata_file.exists():
-            metadata_file.unlink()
+        remove_metadata_file(unique_id)
         
         return jsonify({'success': True, 'message': 'File deleted successfully'})
         
     except Exception as e:
         return jsonify({'error': f'Error deleting file: {str(e)}'}), 500
 
-def process_gpx_file(file_path, original_filename, existing_metadata=None):
-    """Process GPX file and return results"""
-    try:
-        # Extract GPX components with enhanced metadata
-        extractor = GPXExtractor(file_path, PROCESSED_FOLDER)
-        
-        # Load GPX to get metadata before extracting
-        if not extractor.load_gpx():
-            return jsonify({'error': 'Error processing GPX file. Please check the file format.'}), 400
-        
-        # Use existing metadata if provided (for selected files)
-        if existing_metadata:
-            extractor.metadata.update(existing_metadata)
-        
-        # Check for existing versions
-        has_similar, similar_files = extractor.check_existing_version()
-        
-        # Use simple base name for extraction
-        base_name = Path(original_filename).stem
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_dir = PROCESSED_FOLDER / f"{timestamp}_{base_name}_extracted"
-        extractor.output_dir = output_dir
-        output_dir.mkdir(exist_ok=True)
-        
-        # Extract components
-        waypoint_file = extractor.extract_waypoints_enhanced(base_name)
-        track_files = extractor.extract_tracks_enhanced(base_name) 
-        route_files = extractor.extract_routes_enhanced(base_name)
-        
-        # Create enhanced summary
-        summary_file = extractor.create_summary(waypoint_file, track_files, route_files, base_name)
-        
-        if not waypoint_file and not track_files and not route_files:
-            return jsonify({'error': 'No extractable content found in GPX file.'}), 400
-        
-        # Get list of extracted files with enhanced information
-        extracted_files = []
-        
-        if waypoint_file:
-            file_info = {
-                'name': waypoint_file.name,
-                'size': waypoint_file.stat().st_size,
-                'type': 'waypoints',
-                'count': extractor.metadata['waypoint_count']
-            }
-            extracted_files.append(file_info)
-        
-        for track_file in track_files:
-            file_info = {
-                'name': track_file.name,
-                'size': track_file.stat().st_size,
-                'type': 'track',
-                'count': 0  # Could extract track point count if needed
-            }
-            extracted_files.append(file_info)
-        
-        for route_file in route_files:
-            file_info = {
-                'name': route_file.name,
-                'size': route_file.stat().st_size,
-                'type': 'route',
-                'count': 0  # Could extract route point count if needed
-            }
-            extracted_files.append(file_info)
-        
-        # Sort files by type and name
-        extracted_files.sort(key=lambda x: (x['type'], x['name']))
-        
-        # Read summary file for display
-        summary_content = summary_file.read_text() if summary_file.exists() else ""
-        
-        # Prepare enhanced metadata for display
-        enhanced_metadata = {
-            'trail_type': extractor.metadata.get('trail_type'),
-            'section_markers': extractor.metadata.get('section_markers', []),
-            'latest_modification': extractor.metadata.get('latest_modification'),
-            'creator': extractor.metadata.get('creator'),
-            'content_hash': extractor.metadata.get('content_hash'),
-            'suggested_name': base_name,
-            'similar_versions': similar_files if has_similar else None
-        }
-        
-        return render_template('results.html', 
-                             extracted_files=extracted_files,
-                             original_filename=original_filename,
-                             output_directory=output_dir.name,
-                             summary=summary_content,
-                             enhanced_metadata=enhanced_metadata,
-                             metadata=extractor.metadata)
-    
-    except Exception as e:
-        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
-
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and processing with enhanced metadata analysis"""
@@ -724,13 +905,13 @@ def upload_file():
     try:
         # Save uploaded file temporarily to extract metadata
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
         temp_path = UPLOAD_FOLDER / f"temp_{timestamp}_{filename}"
         
-        file.save(temp_path)
+        file_digest = save_upload(file, temp_path)
         
         # Extract metadata first
-        extractor = GPXExtractor(temp_path, PROCESSED_FOLDER)
+        extractor = GPXExtractor(temp_path, PROCESSED_FOLDER, file_digest=file_digest)
         
         # Load GPX to get metadata
         if not extractor.load_gpx():
@@ -738,25 +919,24 @@ def upload_file():
             flash('Error processing GPX file. Please check the file format.', 'error')
             return redirect('/extract-gpx-parts/')
 
-        # DEBUG: print all extracted metadata + raw GPX content
-        print(f"\n=== GPX METADATA DEBUG ===", flush=True)
-        print(f"Original filename: {file.filename}", flush=True)
-        print(f"Metadata from GPX extractor:", flush=True)
-        for k, v in extractor.metadata.items():
-            print(f"  {k}: {v}", flush=True)
-
-        # Print raw track/waypoint names directly from the GPX tree
-        print(f"\nRaw names from GPX elements:", flush=True)
-        ns = extractor.namespace.get('default', '')
-        root = extractor.root
-        for tag in ['trk', 'wpt', 'rte']:
-            full_tag = f'{{{ns}}}{tag}' if ns else tag
-            for elem in root.findall(f'.//{full_tag}'):
-                name_tag = f'{{{ns}}}name' if ns else 'name'
-                name_el = elem.find(name_tag)
-                if name_el is not None and name_el.text:
-                    print(f"  <{tag}> name: {name_el.text}", flush=True)
-        print(f"==========================\n", flush=True)
+        # DEBUG: print all extracted metadata + raw GPX content (debug mode only, so
+        # production uploads skip the extra pass over the tree)
+        if app.debug:
+            print(f"\n=== GPX METADATA DEBUG ===", flush=True)
+            print(f"Original filename: {file.filename}", flush=True)
+            print(f"Metadata from GPX extractor:", flush=True)
+            for k, v in extractor.metadata.items():
+                print(f"  {k}: {v}", flush=True)
+
+            # Print raw track/waypoint names directly from the GPX tree
+            print(f"\nRaw names from GPX elements:", flush=True)
+            name_tag = extractor.queries['name']
+            for tag in ['trk', 'wpt', 'rte']:
+                for elem in extractor.top_level.get(extractor.queries[tag], []):
+                    name_el = elem.find(name_tag)
+                    if name_el is not None and name_el.text:
+                        print(f"  <{tag}> name: {name_el.text}", flush=True)
+            print(f"==========================\n", flush=True)
         
         # Get clean name for comparison - extract short name from the uploaded filename
         clean_name = extract_short_name(Path(filename).stem)
@@ -772,9 +952,7 @@ def upload_file():
                 if old_file_path.exists():
                     old_file_path.unlink()
                 
-                old_metadata_file = METADATA_FOLDER / f"{existing_file['unique_id']}.json"
-                if old_metadata_file.exists():
-                    old_metadata_file.unlink()
+                remove_metadata_file(existing_file['unique_id'])
                 
                 flash(f'Updated {clean_name} with newer version', 'success')
             else:
@@ -833,49 +1011,104 @@ def upload_file():
 def download_file(directory, filename):
     """Download a specific extracted file"""
     try:
-        file_path = PROCESSED_FOLDER / directory / filename
-        if not file_path.exists():
-            flash('File not found', 'error')
-            return redirect('/extract-gpx-parts/')
-        
-        return send_file(file_path, as_attachment=True, download_name=filename)
+        # send_from_directory keeps the path inside PROCESSED_FOLDER and, like
+        # send_file, answers repeat downloads via ETag/Last-Modified with a 304
+        return send_from_directory(PROCESSED_FOLDER, f"{directory}/{filename}",
+                                   as_attachment=True, download_name=filename)
     
+    except NotFound:
+        flash('File not found', 'error')
+        return redirect('/extract-gpx-parts/')
     except Exception as e:
         flash(f'Error downloading file: {str(e)}', 'error')
         return redirect('/extract-gpx-parts/')
 
+# Archives are compressed per download, so favour speed: on GPX text zlib
+# level 1 is ~3x faster than the default level 6 for ~20% larger output
+ZIP_COMPRESSLEVEL = 1
+
+class ZipStream:
+    """Write-only sink that collects what ZipFile writes so it can be yielded.
+
+    It has no tell()/seek(), so ZipFile writes each member with a trailing
+    data descriptor instead of seeking back to patch its header.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        """Return and forget everything written so far"""
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def iter_zip(files):
+    """Yield a ZIP archive of (path, arcname) pairs piece by piece as it is written"""
+    stream = ZipStream()
+    buffer = bytearray(1 << 16)
+    chunk = memoryview(buffer)
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as zipf:
+        for path, arcname in files:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            # Same per-member settings ZipFile.write() applies
+            zinfo.compress_type = zipf.compression
+            if hasattr(zinfo, 'compress_level'):
+                zinfo.compress_level = zipf.compresslevel  # Python 3.13+
+            else:
+                zinfo._compresslevel = zipf.compresslevel
+            # Read into one reusable buffer; zlib and crc32 take the memoryview
+            # directly, so no bytes object is allocated per chunk
+            with open(path, 'rb', buffering=0) as src, zipf.open(zinfo, 'w') as dest:
+                while size := src.readinto(buffer):
+                    dest.write(chunk[:size])
+                    if stream.chunks:
+                        yield stream.take()
+    yield stream.take()
+
+def zip_response(files, zip_name):
+    """Stream a ZIP archive of (path, arcname) pairs as a download"""
+    return Response(iter_zip(files), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={zip_name}'})
+
 @app.route('/download-selected', methods=['POST'])
 def download_selected():
     """Download selected files as a ZIP archive"""
     try:
-        selected_files = request.json.get('files', [])
-        directory = request.json.get('directory')
+        payload = request.get_json(silent=True) or {}
+        selected_files = payload.get('files') or []
+        directory = payload.get('directory')
         
         if not selected_files:
             return jsonify({'error': 'No files selected'}), 400
+        if not directory:
+            return jsonify({'error': 'No directory given'}), 400
         
-        output_dir = PROCESSED_FOLDER / directory
-        
-        # Create temporary ZIP file
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        temp_zip.close()
+        output_dir = resolve_output_dir(directory)
+        if output_dir is None:
+            return jsonify({'error': 'Directory not found'}), 404
+        files = []
+        for filename in selected_files:
+            file_path = safe_join(str(output_dir), filename)
+            if file_path and os.path.isfile(file_path):
+                files.append((file_path, filename))
         
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for filename in selected_files:
-                file_path = output_dir / filename
-                if file_path.exists():
-                    zipf.write(file_path, filename)
+        # A single file needs no archive; send it as is
+        if len(files) == 1:
+            file_path, filename = files[0]
+            return send_file(file_path, as_attachment=True, download_name=filename)
         
-        zip_name = f"selected_gpx_files_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        zip_name = f"selected_gpx_files_{time.strftime('%Y%m%d_%H%M%S')}.zip"
         
-        def remove_file(response):
-            try:
-                os.unlink(temp_zip.name)
-            except Exception:
-                pass
-            return response
-        
-        return send_file(temp_zip.name, as_attachment=True, download_name=zip_name)
+        # Stream the archive while it is compressed instead of building it in a temp file first
+        return zip_response(files, zip_name)
     
     except Exception as e:
         return jsonify({'error': f'Error creating ZIP file: {str(e)}'}), 500
@@ -884,31 +1117,20 @@ def download_selected():
 def download_all(directory):
     """Download all extracted files as a ZIP archive"""
     try:
-        output_dir = PROCESSED_FOLDER / directory
-        
-        if not output_dir.exists():
+        output_dir = resolve_output_dir(directory)
+        try:
+            if output_dir is None:
+                raise FileNotFoundError(directory)
+            with os.scandir(output_dir) as entries:
+                files = [(entry.path, entry.name) for entry in entries if entry.is_file()]
+        except FileNotFoundError:
             flash('Directory not found', 'error')
             return redirect('/extract-gpx-parts/')
         
-        # Create temporary ZIP file
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        temp_zip.close()
+        zip_name = f"all_extracted_files_{time.strftime('%Y%m%d_%H%M%S')}.zip"
         
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in output_dir.glob('*'):
-                if file_path.is_file():
-                    zipf.write(file_path, file_path.name)
-        
-        zip_name = f"all_extracted_files_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-        
-        def remove_file(response):
-            try:
-                os.unlink(temp_zip.name)
-            except Exception:
-                pass
-            return response
-        
-        return send_file(temp_zip.name, as_attachment=True, download_name=zip_name)
+        # Stream the archive while it is compressed instead of building it in a temp file first
+        return zip_response(files, zip_name)
     
     except Exception as e:
         flash(f'Error creating ZIP file: {str(e)}', 'error')
@@ -918,20 +1140,27 @@ def download_all(directory):
 def get_file_info(directory):
     """API endpoint to get file information for AJAX requests"""
     try:
-        output_dir = PROCESSED_FOLDER / directory
-        
-        if not output_dir.exists():
+        output_dir = resolve_output_dir(directory)
+        try:
+            if output_dir is None:
+                raise FileNotFoundError(directory)
+            result_files = list_result_files(output_dir)
+        except FileNotFoundError:
             return jsonify({'error': 'Directory not found'}), 404
         
+        # Resolve the route once and append each quoted filename, with the
+        # same safe characters url_for uses for a path segment
+        url_prefix = url_for('download_file', directory=directory, filename='_')[:-1]
+        
         files = []
-        for file_path in output_dir.glob('*.gpx'):
+        for name, size in result_files:
             file_info = {
-                'name': file_path.name,
-                'size': file_path.stat().st_size,
-                'type': 'waypoints' if 'waypoints' in file_path.name else 
-                        'track' if 'track' in file_path.name else 
-                        'route' if 'route' in file_path.name else 'unknown',
-                'url': url_for('download_file', directory=directory, filename=file_path.name)
+                'name': name,
+                'size': size,
+                'type': 'waypoints' if 'waypoints' in name else 
+                        'track' if 'track' in name else 
+                        'route' if 'route' in name else 'unknown',
+                'url': url_prefix + quote(name, safe="!$&'()*+,:;=@")
             }
             files.append(file_info)
         
@@ -955,24 +1184,40 @@ app.jinja_env.filters['format_file_size'] = format_file_size
 @app.route('/processing/<job_id>')
 def processing_page(job_id):
     """Show processing page for a job"""
-    with job_lock:
-        if job_id not in processing_jobs:
-            print(f"Job {job_id} not found in processing_jobs. Available jobs: {list(processing_jobs.keys())}", flush=True)
-            flash('Processing job not found', 'error')
-            return redirect('/extract-gpx-parts/')
-        
-        job = processing_jobs[job_id]
-        
-        # If job is already complete, redirect to results
-        if job['status'] == 'completed':
-            return redirect(url_for('get_job_result', job_id=job_id))
-        
-        # Use a default filename since we don't store it in job data
-        filename = 'GPX File'
+    job = processing_jobs.get(job_id)
+    if job is None:
+        print(f"Job {job_id} not found in processing_jobs. Available jobs: {list(processing_jobs)}", flush=True)
+        flash('Processing job not found', 'error')
+        return redirect('/extract-gpx-parts/')
+    
+    # If job is already complete, redirect to results
+    if job['status'] == 'completed':
+        return redirect(url_for('get_job_result', job_id=job_id))
+    
+    # Use a default filename since we don't store it in job data
+    filename = 'GPX File'
     
     print(f"Rendering processing page for job {job_id}", flush=True)
     return render_template('processing.html', job_id=job_id, filename=filename)
 
+if BaseApplication is not None:
+    class GunicornServer(BaseApplication):
+        """Run a WSGI app under gunicorn with settings given in code"""
+
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Runs in the worker that serves requests, after gunicorn forks it
+            start_cleanup_thread()
+            return self.application
+
 if __name__ == '__main__':
     print("🌐 Starting GPX Extractor Web Interface...")
     print("📁 Upload directory:", UPLOAD_FOLDER.absolute())
@@ -983,5 +1228,19 @@ if __name__ == '__main__':
     print(f"🔗 Access the application at: http://localhost:{port}")
     print()
     
-    # Run Flask application
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    if BaseApplication is None or os.environ.get('FLASK_DEV') == '1':
+        # Run Flask application. Each request gets its own thread, so uploads,
+        # sidecar I/O and open /progress streams don't block other requests
+        start_cleanup_thread()
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+    else:
+        # A single worker process, since job status, progress streams and the
+        # metadata caches live in its memory; its threads serve requests
+        # concurrently and downloads go out via sendfile(2)
+        GunicornServer(app, {
+            'bind': f'0.0.0.0:{port}',
+            'workers': 1,
+            'worker_class': 'gthread',
+            'threads': int(os.environ.get('WEB_THREADS', '8')),
+            'sendfile': True,
+        }).run()
\ No newline at end of file
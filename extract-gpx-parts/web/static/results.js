@@ -141,7 +141,10 @@ async function downloadSelected() {
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
-        a.download = `selected_gpx_files_${new Date().toISOString().slice(0, 10)}.zip`;
+        // A single file is sent as is, several come as a ZIP archive
+        a.download = selectedFiles.length === 1
+            ? selectedFiles[0]
+            : `selected_gpx_files_${new Date().toISOString().slice(0, 10)}.zip`;
         document.body.appendChild(a);
         a.click();
         document.body.removeChild(a);